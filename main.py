@@ -1,9 +1,10 @@
+import atexit
 import schedule
 import time
-import json
 from modules.reddit_bot import RedditBot
 from modules.openai_bot import OpenAIBot
 from modules.cache_manager import CacheManager
+from modules import fast_json
 from dotenv import load_dotenv
 import os
 import logging
@@ -15,32 +16,56 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 load_dotenv()
 
 
+CONFIG_PATH = "config.json"
+
+# Parsed config.json, reused until the file's modification time changes.
+_config_cache = {"mtime": None, "data": None}
+
+
 def load_config():
     """
     Load configuration settings from config.json.
 
+    The parsed configuration is cached and only re-read when the file has been modified.
+
     Returns:
         dict: The loaded configuration dictionary.
     """
-    with open("config.json", "r") as f:
-        return json.load(f)
+    mtime = os.stat(CONFIG_PATH).st_mtime
+    if _config_cache["data"] is None or mtime != _config_cache["mtime"]:
+        with open(CONFIG_PATH, "rb") as f:
+            _config_cache["data"] = fast_json.loads(f.read())
+        _config_cache["mtime"] = mtime
+    return _config_cache["data"]
+
 
+config = load_config()  # Load the config from config.json.
+system_config = config.get("system", {})
 
 # Initialize our modules.
-reddit_bot = RedditBot()
+reddit_bot = RedditBot(max_workers=system_config.get("reddit_max_workers", 4))
 # openai_bot uses a prompt template file; update the path as needed.
 openai_bot = OpenAIBot(
     review_prompt_path="modules/prompts/review_post_prompt.txt",
     sentiment_prompt_path="modules/prompts/sentiment_analysis_prompt.txt",
-    summarization_prompt_path="modules/prompts/summarization_prompt.txt"
+    summarization_prompt_path="modules/prompts/summarization_prompt.txt",
+    batch_review_prompt_path="modules/prompts/review_posts_batch_prompt.txt",
+    requests_per_minute=system_config.get("openai_requests_per_minute", 60),
+    review_batch_size=system_config.get("openai_review_batch_size", 10),
+    max_concurrent_requests=system_config.get("openai_max_concurrent_requests", 4),
+    response_cache_size=system_config.get("openai_response_cache_size", 2048)
 )
-
-config = load_config()  # Load the config from config.json.
-system_config = config.get("system", {})
 cache_manager = CacheManager(
     cache_file=system_config.get("cache_file", "cache.json"),
-    expiration_time=system_config.get("cache_expiration_seconds", 172800)
+    expiration_time=system_config.get("cache_expiration_seconds", 172800),
+    batch_size=system_config.get("cache_batch_size", 50),
+    cache_format=system_config.get("cache_format", "json"),
+    max_entries=system_config.get("cache_max_entries", 65536)
 )
+# Persist any cache additions that have not been written yet when the process exits.
+atexit.register(cache_manager.flush)
+# Deliver any Telegram messages still queued when the process exits.
+atexit.register(reddit_bot.wait_for_outbox)
 
 
 def run_reddit_checks():
@@ -50,10 +75,9 @@ def run_reddit_checks():
     """
     config = load_config()
     reddit_sources = config.get("platforms", {}).get("reddit", {})
-    system_config = config.get("system", {})
 
-    # reddit_bot.run(reddit_sources, openai_bot, cache_manager, system_config)
     reddit_bot.run(reddit_sources, openai_bot, cache_manager, config)
+    cache_manager.flush()
 
 
 def cleanup_cache():
@@ -83,7 +107,12 @@ try:
     run_reddit_checks()
     send_daily_heartbeat()
     while True:
+        idle_seconds = schedule.idle_seconds()
+        if idle_seconds is None:
+            break  # No jobs scheduled.
+        if idle_seconds > 0:
+            # Sleep until the next job is due, re-checking the schedule at least once a minute.
+            time.sleep(min(idle_seconds, 60))
         schedule.run_pending()
-        time.sleep(1)
 except KeyboardInterrupt:
     logging.info("Bot stopped by user.")
@@ -1,75 +1,245 @@
-import json
+import heapq
 import os
+from collections import OrderedDict
+import threading
 import time
 import logging
+from typing import Iterable
+from modules import fast_json
+
+CACHE_FORMATS = ("json", "log")
+
 
 class CacheManager:
     """A cache manager to store, back up, and manage processed message IDs.
 
-    This class loads and saves a JSON file containing message IDs with timestamps.
+    This class loads and saves a file containing message IDs with their expiry timestamps.
     It provides methods to check if a message is cached, add new messages, print the cache,
     delete and reset the cache, and clean up old entries.
+
+    The cache holds at most max_entries IDs; once full, the least recently added entries are
+    evicted before they expire.
+
+    Additions are kept in memory and written to disk in batches; call flush() to persist
+    any pending changes. Methods that modify or write the cache are safe to call from
+    multiple threads.
+
+    Two on-disk formats are supported:
+      - "json": the whole cache is stored as a single JSON object and rewritten on every save.
+      - "log": an append-only file with one "message_id<TAB>expiry" line per entry. New
+        entries are appended, and the file is compacted to the live entries during cleanup().
     """
-    def __init__(self, cache_file: str, expiration_time: int) -> None:
+    def __init__(self, cache_file: str, expiration_time: int, batch_size: int = 50,
+                 cache_format: str = "json", max_entries: int = 65536) -> None:
         """Initializes the CacheManager.
 
         Args:
-            cache_file (str): The path to the cache JSON file.
+            cache_file (str): The path to the cache file.
             expiration_time (int): The time in seconds after which a cache entry expires.
+            batch_size (int): The number of additions after which the cache is saved automatically.
+            cache_format (str): The on-disk format, either "json" or "log".
+            max_entries (int): The maximum number of message IDs kept in the cache.
         """
+        if cache_format not in CACHE_FORMATS:
+            raise ValueError(f"Unsupported cache format '{cache_format}'. Expected one of {CACHE_FORMATS}.")
         self.cache_file: str = cache_file
         self.expiration_time: int = expiration_time
-        self.cache: dict = {}
+        self.batch_size: int = batch_size
+        self.cache_format: str = cache_format
+        self.max_entries: int = max_entries
+        self.cache: OrderedDict = OrderedDict()
+        self._dirty: bool = False
+        self._needs_rewrite: bool = False
+        self._pending: list = []
+        # Min-heap of (expiry, message_id) so cleanup() only visits expired entries.
+        # Entries whose expiry no longer matches the cache are stale and skipped.
+        self._expiry_heap: list = []
+        self._lock = threading.RLock()
         self.load_cache()
 
     def load_cache(self) -> None:
-        """Loads the cache from the specified JSON file.
+        """Loads the cache from the specified file.
 
-        If the file does not exist or an error occurs during loading, an empty cache is initialized.
+        If the file does not exist, is empty, holds unexpected content, or an error occurs during
+        loading, an empty cache is initialized.
         """
+        self.cache = {}
         if os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    self.cache = json.load(f)
+                if os.path.getsize(self.cache_file) == 0:
+                    pass
+                elif self.cache_format == "log":
+                    self.cache = self._read_log()
+                else:
+                    with open(self.cache_file, "rb") as f:
+                        data = f.read()
+                    self.cache = self._parse_json_entries(fast_json.loads(data))
+                self._migrate_insertion_timestamps()
             except Exception as e:
                 logging.error(f"Error loading cache: {e}")
                 self.cache = {}
-        else:
-            self.cache = {}
+        # Order entries oldest first so LRU eviction removes the ones closest to expiring.
+        self.cache = OrderedDict(sorted(self.cache.items(), key=lambda item: item[1]))
+        self._evict_overflow()
+        self._rebuild_expiry_heap()
+
+    def _parse_json_entries(self, data: object) -> dict:
+        """Validates the contents of a JSON cache file.
+
+        Args:
+            data (object): The decoded JSON document.
+
+        Returns:
+            dict: The message IDs mapped to their timestamps as floats.
+
+        Raises:
+            ValueError: If the document is not a JSON object or a timestamp is not numeric.
+            TypeError: If a timestamp is not a number or string.
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+        return {message_id: float(ts) for message_id, ts in data.items()}
+
+    def _migrate_insertion_timestamps(self) -> None:
+        """Converts entries written with insertion timestamps into expiry timestamps.
+
+        Older cache files stored the time an entry was added rather than when it expires. Such a
+        file's newest timestamp is no later than the file's last modification, whereas a file
+        written with expiry timestamps always holds one that is later, because entries are saved
+        right after they are added. Only files in the old format are converted, so entries that
+        expired while the bot was down are not given a new expiry.
+        """
+        if not self.cache or max(self.cache.values()) > os.path.getmtime(self.cache_file):
+            return
+        logging.info(f"Converting insertion timestamps in cache file '{self.cache_file}' to expiry timestamps.")
+        for message_id, ts in self.cache.items():
+            self.cache[message_id] = ts + self.expiration_time
+
+    def _evict_overflow(self) -> None:
+        """Evicts the least recently added entries until the cache holds at most max_entries IDs.
+
+        Their expiry heap entries become stale and are skipped by cleanup().
+        """
+        evicted: int = 0
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+            evicted += 1
+        if evicted:
+            logging.debug(f"Evicted {evicted} cache entries over the {self.max_entries} entry limit.")
+
+    def _rebuild_expiry_heap(self) -> None:
+        """Rebuilds the expiry heap from the current cache contents."""
+        self._expiry_heap = [(ts, message_id) for message_id, ts in self.cache.items()]
+        heapq.heapify(self._expiry_heap)
+
+    def _read_log(self) -> dict:
+        """Reads an append-only cache log. Later lines override earlier ones for the same ID.
+
+        Returns:
+            dict: The message IDs mapped to their expiry timestamps.
+        """
+        cache: dict = {}
+        skipped: int = 0
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            for line in f:
+                message_id, _, timestamp = line.rstrip("\n").partition("\t")
+                try:
+                    cache[message_id] = float(timestamp)
+                except ValueError:
+                    skipped += 1
+        if skipped:
+            logging.warning(f"Skipped {skipped} malformed line(s) in cache file '{self.cache_file}'.")
+        return cache
 
     def save_cache(self) -> None:
-        """Saves the current in-memory cache to the JSON file.
+        """Saves the current in-memory cache to the cache file.
 
         Overwrites any existing cache file.
         """
+        with self._lock:
+            try:
+                if self.cache_format == "log":
+                    with open(self.cache_file, "w", encoding="utf-8") as f:
+                        f.write("".join(f"{message_id}\t{ts}\n" for message_id, ts in self.cache.items()))
+                else:
+                    with open(self.cache_file, "wb") as f:
+                        f.write(fast_json.dumpb(self.cache))
+                self._dirty = False
+                self._needs_rewrite = False
+                self._pending = []
+            except Exception as e:
+                logging.error(f"Error saving cache: {e}")
+
+    def _append_pending(self) -> None:
+        """Appends the entries added since the last write to the cache log. Caller must hold the lock."""
         try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.cache, f)
+            with open(self.cache_file, "a", encoding="utf-8") as f:
+                f.write("".join(
+                    f"{message_id}\t{self.cache[message_id]}\n"
+                    for message_id in self._pending if message_id in self.cache
+                ))
+            self._dirty = False
+            self._pending = []
         except Exception as e:
-            logging.error(f"Error saving cache: {e}")
+            logging.error(f"Error appending to cache: {e}")
+
+    def flush(self) -> None:
+        """Saves the cache to disk if it has changed since the last save.
+
+        In "log" format only the new entries are appended, unless entries were removed and
+        the file needs to be compacted.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            if self.cache_format == "log" and not self._needs_rewrite:
+                self._append_pending()
+            else:
+                self.save_cache()
 
     def is_cached(self, message_id: str) -> bool:
-        """Checks if a message is in the cache and is less than 24 hours old.
+        """Checks if a message is in the cache.
+
+        Expired entries are not checked here; they are removed by cleanup().
 
         Args:
             message_id (str): The unique identifier of the message.
 
         Returns:
-            bool: True if the message is in the cache and was added less than 24 hours ago; otherwise, False.
+            bool: True if the message is in the cache; otherwise, False.
         """
-        if message_id in self.cache:
-            if time.time() - self.cache[message_id] < self.expiration_time:
-                return True
-        return False
+        return message_id in self.cache
 
     def add(self, message_id: str) -> None:
-        """Adds a message ID to the cache with the current timestamp.
+        """Adds a message ID to the cache, expiring expiration_time seconds from now.
+
+        The cache is only written to disk once batch_size additions are pending.
 
         Args:
             message_id (str): The unique identifier of the message.
         """
-        self.cache[message_id] = time.time()
-        self.save_cache()
+        self.add_many([message_id])
+
+    def add_many(self, message_ids: Iterable[str]) -> None:
+        """Adds several message IDs to the cache at once, expiring expiration_time seconds from now.
+
+        The cache is written to disk at most once, and only if batch_size additions are pending.
+        If the cache grows beyond max_entries, the least recently added entries are evicted.
+
+        Args:
+            message_ids (Iterable[str]): The unique identifiers of the messages.
+        """
+        with self._lock:
+            expires_at: float = time.time() + self.expiration_time
+            for message_id in message_ids:
+                self.cache[message_id] = expires_at
+                self.cache.move_to_end(message_id)
+                heapq.heappush(self._expiry_heap, (expires_at, message_id))
+                self._pending.append(message_id)
+                self._dirty = True
+            self._evict_overflow()
+            if len(self._pending) >= self.batch_size:
+                self.flush()
 
     def print_cache(self) -> None:
         """Prints the current cache to the terminal."""
@@ -78,27 +248,37 @@ class CacheManager:
     def delete_and_reset(self) -> None:
         """Deletes the in-memory cache and removes the cache file from disk.
 
-        Resets the cache dictionary and attempts to delete the cache JSON file.
+        Resets the cache dictionary and attempts to delete the cache file.
         """
-        self.cache = {}  # Reset in-memory cache
-        if os.path.exists(self.cache_file):
-            try:
-                os.remove(self.cache_file)
-                logging.info("Cache file removed successfully.")
-            except Exception as e:
-                logging.error(f"Error deleting cache file: {e}")
+        with self._lock:
+            self.cache = OrderedDict()  # Reset in-memory cache
+            self._expiry_heap = []
+            self._dirty = False
+            self._needs_rewrite = False
+            self._pending = []
+            if os.path.exists(self.cache_file):
+                try:
+                    os.remove(self.cache_file)
+                    logging.info("Cache file removed successfully.")
+                except Exception as e:
+                    logging.error(f"Error deleting cache file: {e}")
 
     def cleanup(self) -> None:
-        """Removes cache entries older than the configured expiration time.
+        """Removes cache entries whose expiry time has passed.
 
-        Iterates over cached entries and deletes those whose timestamp is older than expiration_time.
+        Pops expired entries off the expiry heap and deletes them from the cache, then persists
+        any pending changes. In "log" format this compacts the file to the live entries.
         """
-        current_time: float = time.time()
-        removed: list = []
-        for msg_id, timestamp in list(self.cache.items()):
-            if current_time - timestamp > self.expiration_time:
-                removed.append(msg_id)
-                del self.cache[msg_id]
-        if removed:
-            logging.info(f"Cleaned up messages: {removed}")
-            self.save_cache()
+        with self._lock:
+            current_time: float = time.time()
+            removed: list = []
+            while self._expiry_heap and self._expiry_heap[0][0] < current_time:
+                expires_at, msg_id = heapq.heappop(self._expiry_heap)
+                if self.cache.get(msg_id) == expires_at:
+                    removed.append(msg_id)
+                    del self.cache[msg_id]
+            if removed:
+                logging.info(f"Cleaned up messages: {removed}")
+                self._dirty = True
+                self._needs_rewrite = True
+            self.flush()
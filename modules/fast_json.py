@@ -0,0 +1,55 @@
+# FILE: fast_json.py
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library.
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches errors from either backend.
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserializes a JSON document, using orjson when it is installed.
+
+    Args:
+        data (Union[str, bytes]): The JSON document.
+
+    Returns:
+        Any: The decoded Python object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumpb(obj: Any) -> bytes:
+    """
+    Serializes an object to UTF-8 encoded JSON bytes, using orjson when it is installed.
+
+    Args:
+        obj (Any): The object to serialize.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serializes an object to a JSON string, using orjson when it is installed.
+
+    Args:
+        obj (Any): The object to serialize.
+
+    Returns:
+        str: The JSON document.
+    """
+    return dumpb(obj).decode("utf-8")
@@ -1,30 +1,179 @@
 # FILE: openai_bot.py
 
+import hashlib
 import os
+import string
+import threading
 import time
 import logging
-from typing import Any, Optional, List, Dict
+from collections import OrderedDict
+from typing import Any, Callable, Optional, List, Dict, Tuple
 from openai import OpenAI  # Assumes your OpenAI library provides this class
+from modules import fast_json
+from modules.social_media_bot import parse_sentiment
+
+
+# Tool specifications used to force structured JSON output. Built once at import time and
+# shared by every request.
+_REVIEW_TOOL: List[Dict[str, Any]] = [{
+    "type": "function",
+    "function": {
+        "name": "review_post",
+        "description": "Return a JSON object indicating if the post is significant along with an explanation.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "is_significant": {
+                    "type": "boolean",
+                    "description": "True if the post is market-moving, false otherwise."
+                },
+                "explanation": {
+                    "type": "string",
+                    "description": "A brief explanation of the decision."
+                }
+            },
+            "required": ["is_significant", "explanation"]
+        }
+    }
+}]
+
+_BATCH_REVIEW_TOOL: List[Dict[str, Any]] = [{
+    "type": "function",
+    "function": {
+        "name": "review_posts",
+        "description": "Return a JSON object with one review per post indicating if it is significant along with an explanation.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "reviews": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {
+                                "type": "string",
+                                "description": "The id of the reviewed post."
+                            },
+                            "is_significant": {
+                                "type": "boolean",
+                                "description": "True if the post is market-moving, false otherwise."
+                            },
+                            "explanation": {
+                                "type": "string",
+                                "description": "A brief explanation of the decision."
+                            }
+                        },
+                        "required": ["id", "is_significant", "explanation"]
+                    }
+                }
+            },
+            "required": ["reviews"]
+        }
+    }
+}]
+
+_SENTIMENT_TOOL: List[Dict[str, Any]] = [{
+    "type": "function",
+    "function": {
+        "name": "analyze_sentiment",
+        "description": "Return a JSON object with a sentiment rating between 0 and 100, along with the market direction (bullish, bearish, or neutral).",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sentiment": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 100,
+                    "description": "Sentiment rating from 0 (no significant sentiment) to 100 (extremely strong sentiment)."
+                },
+                "direction": {
+                    "type": "string",
+                    "enum": ["bullish", "bearish", "neutral"],
+                    "description": "The overall market direction conveyed in the text: bullish (positive opportunity), bearish (negative outlook), or neutral (not significant)."
+                }
+            },
+            "required": ["sentiment", "direction"]
+        }
+    }
+}]
+
+
+def _forced_tool(tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Builds a tool_choice value that forces the model to call the first tool in tools.
+
+    Args:
+        tools (List[Dict[str, Any]]): The tool specifications.
+
+    Returns:
+        Dict[str, Any]: The tool_choice parameter.
+    """
+    return {"type": "function", "function": {"name": tools[0]["function"]["name"]}}
+
+
+def _compile_template(template: str) -> Callable[..., str]:
+    """
+    Parses a str.format-style template once and returns a function that renders it.
+
+    The returned function takes the same keyword arguments as template.format() but does not
+    re-parse the template on every call. Templates using positional fields, attribute/index
+    lookups, conversions or format specs fall back to template.format().
+
+    Args:
+        template (str): The template text.
+
+    Returns:
+        Callable[..., str]: A function rendering the template from keyword arguments.
+    """
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        logging.error(f"Could not parse prompt template: {e}")
+        return template.format
+
+    if any(field is not None and (spec or conversion or not field.isidentifier())
+           for _, field, spec, conversion in parsed):
+        return template.format
+
+    pieces = [(literal, field) for literal, field, _, _ in parsed]
+
+    def render(**values: Any) -> str:
+        return "".join([literal if field is None else literal + str(values[field]) for literal, field in pieces])
+
+    return render
 
 
 class OpenAIBot:
     """
     A bot that interfaces with OpenAI's API using external prompt templates and tool calling.
 
-    This class loads three prompt templates from files:
+    This class loads four prompt templates from files:
       - A review post prompt,
+      - A batch review prompt for reviewing several posts in one request,
       - A sentiment analysis prompt,
       - And a summarization prompt.
 
     For the review and sentiment methods, we use OpenAI's tool calling feature to force
     the output into a specific JSON format.
+
+    API calls are rate limited with a token bucket, so requests only wait when the
+    configured requests-per-minute budget has been used up, and the number of requests
+    in flight at once is capped so concurrent callers cannot flood the API.
+
+    Sentiment and summary responses are memoized in a small LRU cache keyed by a hash of the
+    post text, so reposts and crossposts with identical text do not trigger new API calls.
     """
 
     def __init__(
             self,
             review_prompt_path: str,
             sentiment_prompt_path: str,
-            summarization_prompt_path: str
+            summarization_prompt_path: str,
+            batch_review_prompt_path: str,
+            requests_per_minute: int = 60,
+            review_batch_size: int = 10,
+            max_concurrent_requests: int = 4,
+            response_cache_size: int = 2048
     ) -> None:
         """
         Initializes the OpenAIBot by loading prompt templates from files.
@@ -33,12 +182,29 @@ class OpenAIBot:
             review_prompt_path (str): Path to the review post prompt template.
             sentiment_prompt_path (str): Path to the sentiment analysis prompt template.
             summarization_prompt_path (str): Path to the summarization prompt template.
+            batch_review_prompt_path (str): Path to the batch review prompt template.
+            requests_per_minute (int): Maximum sustained rate of OpenAI API calls.
+            review_batch_size (int): Maximum number of posts reviewed in a single batch request.
+            max_concurrent_requests (int): Maximum number of API calls in flight at the same time.
+            response_cache_size (int): Maximum number of sentiment and summary responses memoized.
         """
         self.api_key: str = os.getenv("OPENAI_API_KEY", "")
         if not self.api_key:
             logging.warning("OPENAI_API_KEY not set. Please set it in .env or the environment.")
         self.client = OpenAI(api_key=self.api_key)
 
+        # Token bucket for rate limiting; starts full so short bursts are not delayed.
+        self.requests_per_minute: int = requests_per_minute
+        self._bucket_tokens: float = float(requests_per_minute)
+        self._bucket_last: float = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        self._request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+
+        # LRU cache of (kind, text digest, character limit) -> response.
+        self.response_cache_size: int = response_cache_size
+        self._response_cache: OrderedDict = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+
         try:
             with open(review_prompt_path, "r", encoding="utf-8") as file:
                 self.review_prompt_template: str = file.read()
@@ -60,13 +226,82 @@ class OpenAIBot:
             logging.error(f"Error loading summarization prompt file '{summarization_prompt_path}': {e}")
             self.summarization_prompt_template = ""
 
+        try:
+            with open(batch_review_prompt_path, "r", encoding="utf-8") as file:
+                self.batch_review_prompt_template: str = file.read()
+        except Exception as e:
+            logging.error(f"Error loading batch review prompt file '{batch_review_prompt_path}': {e}")
+            self.batch_review_prompt_template = ""
+
+        self.review_batch_size: int = review_batch_size
+
+        # Parse the templates once instead of on every request.
+        self._render_review_prompt = _compile_template(self.review_prompt_template)
+        self._render_batch_review_prompt = _compile_template(self.batch_review_prompt_template)
+        self._render_sentiment_prompt = _compile_template(self.sentiment_prompt_template)
+        self._render_summarization_prompt = _compile_template(self.summarization_prompt_template)
+
+    def _wait_for_rate_limit(self) -> None:
+        """
+        Takes one token from the rate-limit bucket, sleeping only if the bucket is empty.
+
+        The lock is held while waiting so concurrent callers are served one token at a time.
+        """
+        rate: float = float(self.requests_per_minute)
+        with self._bucket_lock:
+            while True:
+                now: float = time.monotonic()
+                self._bucket_tokens = min(rate, self._bucket_tokens + (now - self._bucket_last) * rate / 60)
+                self._bucket_last = now
+                if self._bucket_tokens >= 1:
+                    self._bucket_tokens -= 1
+                    return
+                time.sleep((1 - self._bucket_tokens) * 60 / rate)
+
+    def _cached_response(self, kind: str, post_content: str, character_limit: int,
+                         generate: Callable[[], str],
+                         is_valid: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Returns a memoized response for the given text, generating and storing it on a miss.
+
+        Failed responses ("ERROR") and responses rejected by is_valid are not cached so the next
+        call retries the request.
+
+        Args:
+            kind (str): The kind of response, e.g. "sentiment" or "summary".
+            post_content (str): The text the response was generated for.
+            character_limit (int): The character limit the response was generated with.
+            generate (Callable[[], str]): Produces the response on a cache miss.
+            is_valid (Optional[Callable[[str], bool]]): Returns False for responses not worth caching.
+
+        Returns:
+            str: The cached or newly generated response.
+        """
+        digest: bytes = hashlib.blake2b(post_content.encode("utf-8"), digest_size=16).digest()
+        key: Tuple[str, bytes, int] = (kind, digest, character_limit)
+        with self._response_cache_lock:
+            if key in self._response_cache:
+                self._response_cache.move_to_end(key)
+                return self._response_cache[key]
+
+        response: str = generate()
+        if (response != "ERROR" and self.response_cache_size > 0
+                and (is_valid is None or is_valid(response))):
+            with self._response_cache_lock:
+                self._response_cache[key] = response
+                self._response_cache.move_to_end(key)
+                while len(self._response_cache) > self.response_cache_size:
+                    self._response_cache.popitem(last=False)
+        return response
+
     def generate_response(
             self,
             prompt: str,
             max_tokens: int = 50,
             temperature: float = 0.7,
             model: str = "gpt-4o-mini",
-            tools: Optional[List[Dict[str, Any]]] = None  # MODIFIED: from 'functions' to 'tools'
+            tools: Optional[List[Dict[str, Any]]] = None,  # MODIFIED: from 'functions' to 'tools'
+            tool_choice: Any = "auto"
     ) -> str:
         """
         Generate a response from OpenAI's model using the provided prompt and optional tool calling.
@@ -77,6 +312,7 @@ class OpenAIBot:
             temperature (float): Sampling temperature.
             model (str): The model name to use. Ensure your API key is permitted for this model.
             tools (Optional[List[Dict[str, Any]]]): A list of tool specifications to force structured output.
+            tool_choice (Any): "auto", or a {"type": "function", ...} dict forcing a specific tool.
 
         Returns:
             str: The generated response text (or the tool call arguments if tools are provided),
@@ -92,9 +328,11 @@ class OpenAIBot:
             }
             if tools:
                 call_params["tools"] = tools
-                call_params["tool_choice"] = "auto"
+                call_params["tool_choice"] = tool_choice
 
-            chat_completion = self.client.chat.completions.create(**call_params)
+            with self._request_slots:
+                self._wait_for_rate_limit()
+                chat_completion = self.client.chat.completions.create(**call_params)
 
             message = chat_completion.choices[0].message
 
@@ -104,7 +342,6 @@ class OpenAIBot:
             else:
                 response = message.content
 
-            time.sleep(1)  # Sleep to manage rate limits.
             return response.strip() if response else "ERROR"
         except Exception as e:
             logging.error(f"Error during OpenAI API call: {e}")
@@ -121,36 +358,69 @@ class OpenAIBot:
         Returns:
             str: The JSON response from the model.
         """
-        prompt: str = self.review_prompt_template.format(content=post_content)
-        # MODIFIED: Updated function definition to the 'tools' format
-        review_tool = [{
-            "type": "function",
-            "function": {
-                "name": "review_post",
-                "description": "Return a JSON object indicating if the post is significant along with an explanation.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "is_significant": {
-                            "type": "boolean",
-                            "description": "True if the post is market-moving, false otherwise."
-                        },
-                        "explanation": {
-                            "type": "string",
-                            "description": "A brief explanation of the decision."
-                        }
-                    },
-                    "required": ["is_significant", "explanation"]
-                }
-            }
-        }]
+        prompt: str = self._render_review_prompt(content=post_content)
         return self.generate_response(prompt, max_tokens=100, temperature=0.5, model="gpt-4o-mini",
-                                      tools=review_tool)
+                                      tools=_REVIEW_TOOL, tool_choice=_forced_tool(_REVIEW_TOOL))
+
+    def review_posts_batch(self, posts: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """
+        Reviews several posts with one API request per review_batch_size posts.
+        Forces output into a JSON structure with a 'reviews' list holding 'id', 'is_significant'
+        and 'explanation' for every post. Posts whose batch response cannot be parsed, or that are
+        missing from it, are reviewed one at a time with review_post() instead.
+
+        Args:
+            posts (List[Tuple[str, str]]): (post_id, post_content) pairs to review.
+
+        Returns:
+            Dict[str, bool]: Maps each post ID to whether it was deemed significant. Posts whose
+                             individual review also fails map to False.
+        """
+        results: Dict[str, bool] = {post_id: False for post_id, _ in posts}
+        for start in range(0, len(posts), self.review_batch_size):
+            batch = posts[start:start + self.review_batch_size]
+            posts_json = fast_json.dumps([{"id": post_id, "content": content} for post_id, content in batch])
+            prompt: str = self._render_batch_review_prompt(posts=posts_json)
+            response = self.generate_response(prompt, max_tokens=100 * len(batch), temperature=0.5,
+                                              model="gpt-4o-mini", tools=_BATCH_REVIEW_TOOL,
+                                              tool_choice=_forced_tool(_BATCH_REVIEW_TOOL))
+            reviewed: set = set()
+            try:
+                for review in fast_json.loads(response)["reviews"]:
+                    if review.get("id") in results:
+                        results[review["id"]] = bool(review.get("is_significant", False))
+                        reviewed.add(review["id"])
+            except (fast_json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                logging.error(f"Could not parse batch review JSON: {response}")
+
+            for post_id, content in batch:
+                if post_id not in reviewed:
+                    results[post_id] = self._review_post_significance(post_id, content)
+        return results
+
+    def _review_post_significance(self, post_id: str, post_content: str) -> bool:
+        """
+        Reviews a single post with review_post() and returns whether it was deemed significant.
+
+        Args:
+            post_id (str): The post ID, used for logging.
+            post_content (str): The content of the post to review.
+
+        Returns:
+            bool: True if the post is significant; False if it is not or the response cannot be parsed.
+        """
+        response = self.review_post(post_content)
+        try:
+            return bool(fast_json.loads(response).get("is_significant", False))
+        except (fast_json.JSONDecodeError, TypeError, AttributeError):
+            logging.error(f"Could not parse review JSON for post {post_id}: {response}")
+            return False
 
     def analyze_sentiment(self, post_content: str, character_limit: int) -> str:
         """
         Generates a sentiment analysis focusing on bullish sentiment with a specified character limit.
         Forces output into a JSON structure with keys "sentiment" and "direction".
+        Responses are memoized per post text and character limit, unless they cannot be parsed.
 
         Args:
             post_content (str): The text to analyze.
@@ -159,42 +429,19 @@ class OpenAIBot:
         Returns:
             str: The JSON response from the model.
         """
+        def generate() -> str:
+            prompt: str = self._render_sentiment_prompt(character_limit=character_limit, content=post_content)
+            return self.generate_response(prompt, max_tokens=character_limit, temperature=0.7,
+                                          model="gpt-4o-mini", tools=_SENTIMENT_TOOL)
 
-        prompt: str = self.sentiment_prompt_template.format(character_limit=character_limit, content=post_content)
-
-        # MODIFIED: Updated function definition to the 'tools' format
-        sentiment_tool = [{
-            "type": "function",
-            "function": {
-                "name": "analyze_sentiment",
-                "description": "Return a JSON object with a sentiment rating between 0 and 100, along with the market direction (bullish, bearish, or neutral).",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sentiment": {
-                            "type": "integer",
-                            "minimum": 0,
-                            "maximum": 100,
-                            "description": "Sentiment rating from 0 (no significant sentiment) to 100 (extremely strong sentiment)."
-                        },
-                        "direction": {
-                            "type": "string",
-                            "enum": ["bullish", "bearish", "neutral"],
-                            "description": "The overall market direction conveyed in the text: bullish (positive opportunity), bearish (negative outlook), or neutral (not significant)."
-                        }
-                    },
-                    "required": ["sentiment", "direction"]
-                }
-            }
-        }]
-
-        return self.generate_response(prompt, max_tokens=character_limit, temperature=0.7, model="gpt-4o-mini",
-                                      tools=sentiment_tool)
+        return self._cached_response("sentiment", post_content, character_limit, generate,
+                                     is_valid=lambda response: parse_sentiment(response) is not None)
 
     def summarize_text(self, post_content: str, character_limit: int) -> str:
         """
         Summarizes the provided text in exactly the given character limit.
         This method does not force a JSON structure, as free text is acceptable.
+        Responses are memoized per post text and character limit.
 
         Args:
             post_content (str): The text to summarize.
@@ -203,5 +450,8 @@ class OpenAIBot:
         Returns:
             str: The summary response.
         """
-        prompt: str = self.summarization_prompt_template.format(character_limit=character_limit, content=post_content)
-        return self.generate_response(prompt, max_tokens=character_limit, temperature=0.7, model="gpt-4o-mini")
+        def generate() -> str:
+            prompt: str = self._render_summarization_prompt(character_limit=character_limit, content=post_content)
+            return self.generate_response(prompt, max_tokens=character_limit, temperature=0.7, model="gpt-4o-mini")
+
+        return self._cached_response("summary", post_content, character_limit, generate)
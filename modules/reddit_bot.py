@@ -1,29 +1,182 @@
 # FILE: reddit_bot.py
 
 import praw
-import prawcore # IMPORT THIS
+import prawcore
+import requests
 import os
 import logging
-import json
 import time
-from typing import Any, Dict, List
-from modules.social_media_bot import SocialMediaBot
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from modules.social_media_bot import SocialMediaBot, parse_sentiment
+
+
+@dataclass(slots=True)
+class SubredditConfig:
+    """Per-subreddit settings from config.json, parsed once per check."""
+    target_flair: str = "DD"
+    target_flair_lower: str = "dd"
+    min_karma: int = 1000
+    sentiment_threshold: int = 50
+
+    @classmethod
+    def from_dict(cls, settings: Dict[str, Any]) -> "SubredditConfig":
+        """
+        Builds a SubredditConfig from a subreddit's entry in config.json, applying defaults.
+
+        Args:
+            settings (Dict[str, Any]): The subreddit's settings.
+
+        Returns:
+            SubredditConfig: The parsed settings.
+        """
+        target_flair = settings.get("target_flair", "DD")
+        return cls(
+            target_flair=target_flair,
+            target_flair_lower=target_flair.lower(),
+            min_karma=settings.get("min_karma", 1000),
+            sentiment_threshold=settings.get("sentiment_threshold", 50)
+        )
+
+
+class _SerializedRequestor(prawcore.Requestor):
+    """A prawcore Requestor that sends one request at a time.
+
+    The Reddit client is shared by the bot's worker threads, but prawcore's rate limiter keeps
+    unsynchronized state. Serializing the requests keeps them in step with the limit Reddit
+    reports in each response, instead of several workers firing at once on a stale delay.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._request_lock = threading.Lock()
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        with self._request_lock:
+            return super().request(*args, **kwargs)
 
 
 class RedditBot(SocialMediaBot):
     """A Reddit bot that processes report posts, general posts, and subreddit posts and sends significant messages to Telegram."""
 
-    def __init__(self) -> None:
-        """Initializes the Reddit bot using PRAW with credentials from environment variables."""
+    def __init__(self, max_workers: int = 4) -> None:
+        """
+        Initializes the Reddit bot using PRAW with credentials from environment variables.
+
+        Args:
+            max_workers (int): Number of users or subreddits processed concurrently. Reddit
+                               requests are still sent one at a time, so extra workers only
+                               overlap the OpenAI and Telegram work between them.
+        """
+        super().__init__()
+        # Requests go out one at a time (see _SerializedRequestor), so a small keep-alive pool is
+        # enough; retry dropped connections.
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.5)
+        ))
         self.client = praw.Reddit(
             client_id=os.getenv('REDDIT_CLIENT'),
             client_secret=os.getenv('REDDIT_SECRET'),
             username=os.getenv('REDDIT_USERNAME'),
             password=os.getenv('REDDIT_PASSWORD'),
-            user_agent=os.getenv('REDDIT_USER_AGENT')
+            user_agent=os.getenv('REDDIT_USER_AGENT'),
+            requestor_class=_SerializedRequestor,
+            requestor_kwargs={"session": session}
         )
-        # Track processed posts to avoid duplicate processing.
-        self.processed_posts = set()
+        # Users and subreddits are fetched concurrently on a bounded pool.
+        self._io_pool = ThreadPoolExecutor(max_workers=max_workers)
+        # Newest created_utc scanned per (source, user or subreddit), so later checks only look at newer posts.
+        self._last_seen: Dict[Tuple[str, str], float] = {}
+
+    def _run_concurrently(self, func: Callable[..., Any], items: Iterable[Any], *args: Any) -> List[Any]:
+        """
+        Calls func(item, *args) for every item on the I/O thread pool and waits for all calls to finish.
+
+        Args:
+            func (Callable[..., Any]): The per-item function to run.
+            items (Iterable[Any]): The items (usernames or subreddit names) to process.
+            *args (Any): Additional arguments passed to every call.
+
+        Returns:
+            List[Any]: The return values of the calls that succeeded, in completion order.
+        """
+        futures = {self._io_pool.submit(func, item, *args): item for item in items}
+        results = []
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logging.error(f"Error processing {futures[future]}: {e}")
+        return results
+
+    def _fetch_link_karma(self, submissions: Iterable[Any]) -> Dict[str, int]:
+        """
+        Fetches the link karma of the authors of several submissions in batched requests.
+
+        Reading submission.author.link_karma costs one request per author; this looks them all
+        up through Reddit's user-data-by-ID endpoint, 100 authors per request.
+
+        Args:
+            submissions (Iterable[Any]): The submissions whose authors to look up.
+
+        Returns:
+            Dict[str, int]: Maps author fullnames (t2_...) to their link karma. Deleted or
+                            suspended authors are missing from the result.
+        """
+        fullnames = {getattr(submission, "author_fullname", None) for submission in submissions}
+        fullnames.discard(None)
+        if not fullnames:
+            return {}
+        return {
+            redditor.fullname: getattr(redditor, "link_karma", 0)
+            for redditor in self.client.redditors.partial_redditors(fullnames)
+        }
+
+    def _new_user_submissions(
+            self,
+            user: str,
+            source: str,
+            cache_manager: Any,
+            one_week_ago: int
+    ) -> Iterator[Any]:
+        """
+        Yields a user's uncached submissions from the last week that are newer than the previous check.
+
+        The user's last-seen marker for this source is only advanced once the submissions have been
+        fully consumed, so a check that fails part-way is retried in full next time.
+
+        The first check of a user looks at their 25 newest submissions. Later checks page through
+        everything posted since the marker (bounded by the one-week cutoff), so prolific users'
+        posts are not missed between checks while quiet users still cost a single request.
+
+        Args:
+            user (str): The Reddit username.
+            source (str): The list the user belongs to ("report" or "general").
+            cache_manager (Any): Instance of CacheManager.
+            one_week_ago (int): Cutoff timestamp; older submissions are ignored.
+        """
+        key = (source, user)
+        last_seen = self._last_seen.get(key, 0.0)
+        newest_seen = last_seen
+        limit = None if last_seen else 25
+        for submission in self.client.redditor(user).submissions.new(limit=limit):
+            if submission.created_utc <= last_seen:
+                break  # Submissions are newest first; everything from here on was already scanned.
+            if submission.created_utc < one_week_ago:
+                break  # Submissions are newest first, so the rest are older too.
+            newest_seen = max(newest_seen, submission.created_utc)
+            if cache_manager.is_cached(submission.id):
+                logging.debug("%s post %s already processed. Skipping.", source.capitalize(), submission.id)
+                continue
+            yield submission
+        self._last_seen[key] = newest_seen
 
     def check_reports(
             self,
@@ -42,27 +195,42 @@ class RedditBot(SocialMediaBot):
             config (Dict[str, Any]): System configuration parameters.
         """
         # Extract system_config from the full config object
-
-        print("\nCONFIG---------")
-        print(config)
-
+        logging.debug("Config: %s", config)
         system_config = config.get("system", {})
         one_week_ago = int(time.time()) - (7 * 24 * 60 * 60)
 
-        for user in reports_list:
-            try:
-                for submission in self.client.redditor(user).submissions.new(limit=25):
-                    if submission.created_utc >= one_week_ago:
-                        if not cache_manager.is_cached(submission.id):
-                            cache_manager.add(submission.id)
-                            social_score = f'{submission.author.link_karma:,} karma'
-                            self.process_significant_message("Reddit: report", user, submission, openai_bot, system_config, social_score)
-                        else:
-                            logging.debug(f"Report post {submission.id} already processed. Skipping.")
-            except prawcore.exceptions.NotFound:
-                logging.warning(f"Reddit user '{user}' not found. Skipping.")
-            except Exception as e:
-                logging.error(f"Error processing report from {user}: {e}")
+        processed_ids = self._run_concurrently(
+            self._process_report_user, reports_list, openai_bot, cache_manager, system_config, one_week_ago
+        )
+        cache_manager.add_many(post_id for user_ids in processed_ids for post_id in user_ids)
+
+    def _process_report_user(
+            self,
+            user: str,
+            openai_bot: Any,
+            cache_manager: Any,
+            system_config: Dict[str, Any],
+            one_week_ago: int
+    ) -> List[str]:
+        """
+        Processes the recent posts of a single 'reports' user.
+
+        Returns:
+            List[str]: The IDs of the posts that were processed, to be added to the cache.
+        """
+        processed_ids = []
+        try:
+            for submission in self._new_user_submissions(user, "report", cache_manager, one_week_ago):
+                processed_ids.append(submission.id)
+                social_score = f'{submission.author.link_karma:,} karma'
+                self.process_significant_message("Reddit: report", user, submission, openai_bot, system_config, social_score)
+        except prawcore.exceptions.NotFound:
+            logging.warning(f"Reddit user '{user}' not found. Skipping.")
+        except prawcore.exceptions.TooManyRequests:
+            logging.warning(f"Reddit rate limit reached while fetching posts from {user}. Retrying next check.")
+        except Exception as e:
+            logging.error(f"Error processing report from {user}: {e}")
+        return processed_ids
 
     def check_general(
             self,
@@ -71,120 +239,292 @@ class RedditBot(SocialMediaBot):
             cache_manager: Any,
             config: Dict[str, Any]
     ) -> None:
-        """Processes posts from 'general' users."""
+        """
+        Processes posts from 'general' users.
+
+        New posts from all users are collected first and then reviewed for significance in
+        batched OpenAI requests, rather than one request per post. Posts with too little text,
+        such as link posts, are reviewed by their title instead. Significant posts are analyzed and
+        sent to Telegram concurrently.
+        """
         # Extract system_config from the full config object
         system_config = config.get("system", {})
         one_week_ago = int(time.time()) - (7 * 24 * 60 * 60)
 
-        for user in general_list:
-            try:
-                for submission in self.client.redditor(user).submissions.new(limit=25):
-                    if submission.created_utc >= one_week_ago:
-                        if not cache_manager.is_cached(submission.id):
-                            cache_manager.add(submission.id)
-                            significance_json = openai_bot.review_post(submission.selftext)
-                            try:
-                                significance_data = json.loads(significance_json)
-                                is_significant = significance_data.get("is_significant", False)
-                            except (json.JSONDecodeError, TypeError):
-                                is_significant = False
-                                logging.error(f"Could not parse significance JSON: {significance_json}")
-
-                            social_score = f'{submission.author.link_karma:,} karma'
-
-                            if is_significant:
-                                self.process_significant_message(
-                                    "Reddit: general", user, submission, openai_bot, system_config, social_score
-                                )
-                            else:
-                                logging.debug(f"General post {submission.id} from {user} deemed not significant.")
-                        else:
-                            logging.debug(f"General post {submission.id} already processed. Skipping.")
-            except prawcore.exceptions.NotFound:
-                logging.warning(f"Reddit user '{user}' not found. Skipping.")
-            except Exception as e:
-                logging.error(f"Error processing general post from {user}: {e}")
+        candidates = [
+            candidate
+            for user_candidates in self._run_concurrently(
+                self._collect_general_user, general_list, cache_manager, one_week_ago
+            )
+            for candidate in user_candidates
+        ]
+        if not candidates:
+            return
+        cache_manager.add_many(submission.id for _, submission in candidates)
+        if not self._telegram_config(system_config).enabled:
+            logging.info("Telegram notifications are disabled; skipping review of %d general posts.", len(candidates))
+            return
+
+        min_chars = self._min_analyze_chars(system_config)
+        significance = openai_bot.review_posts_batch([
+            (submission.id,
+             submission.selftext if self._has_analyzable_text(submission.selftext, min_chars)
+             else submission.title)
+            for _, submission in candidates
+        ])
+        significant = []
+        for user, submission in candidates:
+            if significance.get(submission.id, False):
+                significant.append((user, submission))
+            else:
+                logging.debug("General post %s from %s deemed not significant.", submission.id, user)
+        if not significant:
+            return
+
+        # Only fetch the authors' karma for posts that will actually be sent.
+        karma_by_author = self._fetch_link_karma(submission for _, submission in significant)
+        self._run_concurrently(
+            self._send_general_post, significant, openai_bot, system_config, karma_by_author
+        )
+
+    def _send_general_post(
+            self,
+            candidate: Tuple[str, Any],
+            openai_bot: Any,
+            system_config: Dict[str, Any],
+            karma_by_author: Dict[str, int]
+    ) -> None:
+        """
+        Analyzes a significant 'general' post and sends it to Telegram.
+
+        Args:
+            candidate (Tuple[str, Any]): The (user, submission) pair to send.
+            openai_bot (Any): Instance of OpenAIBot.
+            system_config (Dict[str, Any]): System configuration parameters.
+            karma_by_author (Dict[str, int]): Link karma by author fullname.
+        """
+        user, submission = candidate
+        try:
+            karma = karma_by_author.get(getattr(submission, "author_fullname", None), 0)
+            social_score = f'{karma:,} karma'
+            self.process_significant_message(
+                "Reddit: general", user, submission, openai_bot, system_config, social_score
+            )
+        except Exception as e:
+            logging.error(f"Error processing general post from {user}: {e}")
+
+    def _collect_general_user(
+            self,
+            user: str,
+            cache_manager: Any,
+            one_week_ago: int
+    ) -> List[Tuple[str, Any]]:
+        """
+        Collects the new, uncached posts of a single 'general' user.
+
+        Returns:
+            List[Tuple[str, Any]]: (user, submission) pairs for the posts to review.
+        """
+        candidates = []
+        try:
+            for submission in self._new_user_submissions(user, "general", cache_manager, one_week_ago):
+                candidates.append((user, submission))
+        except prawcore.exceptions.NotFound:
+            logging.warning(f"Reddit user '{user}' not found. Skipping.")
+        except prawcore.exceptions.TooManyRequests:
+            logging.warning(f"Reddit rate limit reached while fetching posts from {user}. Retrying next check.")
+        except Exception as e:
+            logging.error(f"Error processing general post from {user}: {e}")
+        return candidates
 
     def process_other_sources(
             self,
             sources: Dict[str, Any],
             openai_bot: Any,
             cache_manager: Any,
-            # CHANGE THIS: from system_config to config
             config: Dict[str, Any]
     ) -> None:
         """
         Processes additional sources...
+
+        All configured subreddits are searched with a single multireddit request, and each
+        subreddit's results are then processed concurrently. If the combined search fails, for
+        example because one subreddit is private or banned, every subreddit is searched on its own.
+        Subreddits that may have been crowded out of the combined results are also searched on their own.
+        """
+        subreddits = {
+            name: SubredditConfig.from_dict(settings)
+            for name, settings in sources.get("subreddits", {}).items()
+        }
+        if not subreddits:
+            return
+        try:
+            submissions_by_subreddit: Optional[Dict[str, Optional[List[Any]]]] = self._search_subreddits(subreddits)
+        except Exception as e:
+            logging.warning(f"Combined subreddit search failed, searching subreddits individually: {e}")
+            submissions_by_subreddit = None
+
+        # Pass the full config object down
+        def check(subreddit: str) -> None:
+            submissions = submissions_by_subreddit.get(subreddit) if submissions_by_subreddit is not None else None
+            self.check_subreddit_posts(subreddit, openai_bot, cache_manager, config,
+                                       submissions=submissions, subreddit_config=subreddits[subreddit])
+
+        self._run_concurrently(check, subreddits)
+
+    def _search_subreddits(self, subreddits: Dict[str, SubredditConfig]) -> Dict[str, Optional[List[Any]]]:
+        """
+        Searches all subreddits for their target flairs with one multireddit (r/a+b+c) request.
+
+        The combined search shares one result limit, so a busy subreddit can fill it. If the limit
+        was reached, a subreddit with no results, or whose oldest result is still newer than its
+        last check, may be missing posts; it is mapped to None so that it is searched on its own.
+
+        Args:
+            subreddits (Dict[str, SubredditConfig]): Subreddit names mapped to their configuration.
+
+        Returns:
+            Dict[str, Optional[List[Any]]]: Each configured subreddit name mapped to its results,
+                                            newest first, or None if it needs its own search.
         """
-        for subreddit_name in sources.get("subreddits", {}):
-            # Pass the full config object down
-            self.check_subreddit_posts(subreddit_name, openai_bot, cache_manager, config)
+        names = list(subreddits)
+        flairs = dict.fromkeys(settings.target_flair for settings in subreddits.values())
+        query = " OR ".join(f"flair:'{flair}'" for flair in flairs)
+        name_by_lower = {name.lower(): name for name in names}
+        submissions_by_subreddit: Dict[str, Optional[List[Any]]] = {name: [] for name in names}
+        limit = 25 * len(names)
+        returned = 0
+        results = self.client.subreddit("+".join(names)).search(
+            query, sort="new", time_filter="week", limit=limit
+        )
+        for submission in results:
+            returned += 1
+            name = name_by_lower.get(submission.subreddit.display_name.lower())
+            if name is not None:
+                submissions_by_subreddit[name].append(submission)
+
+        if returned >= limit:
+            for name, submissions in submissions_by_subreddit.items():
+                last_seen = self._last_seen.get(("subreddit", name, subreddits[name].target_flair_lower), 0.0)
+                if not submissions or submissions[-1].created_utc > last_seen:
+                    logging.debug("Subreddit %s may be crowded out of the combined search; searching it on its own.", name)
+                    submissions_by_subreddit[name] = None
+        return submissions_by_subreddit
 
     def check_subreddit_posts(
             self,
             subreddit: str,
             openai_bot: Any,
             cache_manager: Any,
-            # CHANGE THIS: from system_config to config
-            config: Dict[str, Any]
+            config: Dict[str, Any],
+            submissions: Optional[Iterable[Any]] = None,
+            subreddit_config: Optional[SubredditConfig] = None
     ) -> None:
         """
         Processes posts from a specific subreddit...
+
+        If submissions is given (e.g. from a combined multireddit search, newest first), they are
+        processed instead of searching the subreddit. If subreddit_config is not given, the
+        subreddit's settings are read from config.
+
+        Only posts newer than the newest one scanned by the previous check of this subreddit and
+        flair are considered; the scan stops at the first older post. The marker is not moved past
+        a post whose sentiment analysis failed, so that post is retried next time. Authors missing
+        from the karma lookup count as having no karma.
+        The karma of the authors of all posts with a matching flair is fetched in one batched request.
         """
-        # CORRECTED: Get the system config from the full config object
         system_config = config.get("system", {})
 
-        # CORRECTED: Get the subreddit config from the full config object
-        subreddit_config = config.get("platforms", {}).get("reddit", {}).get("subreddits", {}).get(subreddit, {})
+        if subreddit_config is None:
+            subreddit_config = SubredditConfig.from_dict(
+                config.get("platforms", {}).get("reddit", {}).get("subreddits", {}).get(subreddit, {})
+            )
 
-        # Now these lines will correctly load your values (2000 and 50)
-        target_flair = subreddit_config.get("target_flair", "DD")
-        min_karma = subreddit_config.get("min_karma", 1000)
-        sentiment_threshold = subreddit_config.get("sentiment_threshold", 50)
+        target_flair = subreddit_config.target_flair
+        target_flair_lower = subreddit_config.target_flair_lower
+        min_karma = subreddit_config.min_karma
+        sentiment_threshold = subreddit_config.sentiment_threshold
 
-        logging.info(f"Checking subreddit: {subreddit} for flair: '{target_flair}' with min_karma: {min_karma}")
+        logging.info("Checking subreddit: %s for flair: '%s' with min_karma: %s", subreddit, target_flair, min_karma)
 
+        processed_ids = []
+        marker_key = ("subreddit", subreddit, target_flair_lower)
+        last_seen = self._last_seen.get(marker_key, 0.0)
+        newest_seen = last_seen
+        oldest_failed = None
         try:
-            query = f"flair:'{target_flair}'"
-            submissions = self.client.subreddit(subreddit).search(query, sort="new", time_filter="week", limit=25)
+            if submissions is None:
+                query = f"flair:'{target_flair}'"
+                submissions = self.client.subreddit(subreddit).search(
+                    query, sort="new", time_filter="week", limit=25
+                )
 
+            candidates = []
             for submission in submissions:
-                if not cache_manager.is_cached(submission.id):
-                    # (The rest of the logic is correct)
-                    if submission.link_flair_text and submission.link_flair_text.lower() == target_flair.lower():
-                        author = submission.author
-                        if author and author.link_karma >= min_karma:  # This check will now use 2000
-                            sentiment_analysis = openai_bot.analyze_sentiment(submission.selftext, 100)
-                            sentiment_score = self._extract_sentiment_score(sentiment_analysis)
-
-                            social_score = f'{author.link_karma:,} karma'
-
-                            if sentiment_score >= sentiment_threshold:
-                                cache_manager.add(submission.id)
-                                self.process_significant_message(
-                                    f"Reddit: {subreddit}", author.name,
-                                    submission, openai_bot, system_config, social_score
-                                )
-                else:
-                    logging.debug(f"Subreddit post {submission.id} already processed. Skipping.")
+                if submission.created_utc <= last_seen:
+                    break  # Results are newest first; everything from here on was already scanned.
+                newest_seen = max(newest_seen, submission.created_utc)
+                # Cheap checks first: cached posts never reach the author or karma lookups.
+                if cache_manager.is_cached(submission.id):
+                    logging.debug("Subreddit post %s already processed. Skipping.", submission.id)
+                    continue
+                flair = submission.link_flair_text
+                if not flair or flair.lower() != target_flair_lower:
+                    continue
+                if not submission.author:
+                    continue  # Deleted author.
+                candidates.append(submission)
 
+            if candidates and not self._telegram_config(system_config).enabled:
+                logging.info("Telegram notifications are disabled; skipping analysis of %d posts in %s.",
+                             len(candidates), subreddit)
+                candidates = []
+
+            # The authors' karma is only fetched for posts whose flair matches.
+            karma_by_author = self._fetch_link_karma(candidates)
+            min_chars = self._min_analyze_chars(system_config)
+            for submission in candidates:
+                # Suspended and shadowbanned authors are left out of the lookup; skip their posts.
+                karma = karma_by_author.get(submission.author_fullname, 0)
+                if karma >= min_karma and self._has_analyzable_text(submission.selftext, min_chars):
+                    sentiment_analysis = openai_bot.analyze_sentiment(submission.selftext, 100)
+                    sentiment_score = self._extract_sentiment_score(sentiment_analysis)
+                    if sentiment_score < 0:
+                        # The sentiment request failed or its reply could not be parsed; retry on the next check.
+                        oldest_failed = submission.created_utc
+                        continue
+
+                    social_score = f'{karma:,} karma'
+
+                    if sentiment_score >= sentiment_threshold:
+                        processed_ids.append(submission.id)
+                        self.process_significant_message(
+                            f"Reddit: {subreddit}", submission.author.name,
+                            submission, openai_bot, system_config, social_score
+                        )
+
+            if oldest_failed is not None:
+                # Candidates are newest first, so this is the oldest failure. Stop just short of it.
+                newest_seen = max(last_seen, min(newest_seen, oldest_failed - 0.001))
+            self._last_seen[marker_key] = newest_seen
+        except prawcore.exceptions.TooManyRequests:
+            logging.warning(f"Reddit rate limit reached while checking subreddit {subreddit}. Retrying next check.")
         except Exception as e:
             logging.error(f"Error processing subreddit {subreddit}: {e}")
+        cache_manager.add_many(processed_ids)
 
     def _extract_sentiment_score(self, sentiment_data: str) -> int:
         """
         Extracts the sentiment score from OpenAI's JSON response.
 
+        Uses the same parsing as the Telegram message header, so a bare integer response is
+        read as the score here and shown with the neutral header there.
+
         Args:
             sentiment_data (str): The sentiment response from OpenAI.
 
         Returns:
             int: The extracted sentiment score, or -1 if parsing fails.
         """
-
-        try:
-            sentiment_dict = json.loads(sentiment_data)
-            return int(sentiment_dict.get("sentiment", -1))
-        except (json.JSONDecodeError, ValueError, TypeError) as e:
-            logging.error(f"Failed to parse sentiment data: {sentiment_data} | Error: {e}")
-            return -1
\ No newline at end of file
+        parsed = parse_sentiment(sentiment_data)
+        return parsed[0] if parsed is not None else -1
\ No newline at end of file
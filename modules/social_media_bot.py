@@ -1,10 +1,130 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import html
 import time
 import logging
 import os
+import queue
+import re
+import threading
 import requests
-import json
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Dict, List, Optional, Tuple
+from modules import fast_json
+
+# Sentiment used for posts with too little text to analyze; renders as the neutral header.
+DEFAULT_EMPTY_SENTIMENT: Dict[str, Any] = {"sentiment": 0, "direction": "neutral"}
+# Posts with less stripped text than this (link and image posts) are not sent to OpenAI.
+DEFAULT_MIN_ANALYZE_CHARS = 40
+
+# Telegram sentiment headers indexed by emoji count (one emoji per 10 sentiment points).
+BULL_HEADERS = tuple("🔥" * i for i in range(11))
+BEAR_HEADERS = tuple("❄️" * i for i in range(11))
+# Neutral or unknown directions fall back to the "❓" header.
+_SENTIMENT_HEADERS: Dict[str, Tuple[str, ...]] = {"bullish": BULL_HEADERS, "bearish": BEAR_HEADERS}
+
+# Matches the usual tool-call reply, e.g. {"sentiment": 72, "direction": "bullish"}, without a JSON parse.
+_SENTIMENT_RE = re.compile(
+    r'"sentiment"\s*:\s*(\d+)\s*,\s*"direction"\s*:\s*"(bullish|bearish|neutral)"', re.IGNORECASE
+)
+
+# Telegram message header for a significant post, with and without a social score line.
+_TPL_WITH_SCORE = (
+    "<b>Source:</b> {label}\n<b>User:</b> {user}\n<b>Social Score:</b> {score}\n<b>Time:</b> {time}"
+    "\n\n<a href='{link}'>View Original Post</a>"
+)
+_TPL_NO_SCORE = (
+    "<b>Source:</b> {label}\n<b>User:</b> {user}\n<b>Time:</b> {time}"
+    "\n\n<a href='{link}'>View Original Post</a>"
+)
+
+# Source keys handled by check_reports() and check_general(); every other key is passed to process_other_sources().
+_USER_LIST_KEYS = frozenset({"reports", "general"})
+
+# Messages queued close together are combined into one Telegram message, up to this many
+# characters (Telegram's limit is 4096), waiting at most _BATCH_WINDOW_SECONDS for more to arrive.
+_BATCH_MAX_CHARS = 4000
+_BATCH_WINDOW_SECONDS = 0.3
+_BATCH_SEPARATOR = "\n\n—\n\n"
+
+# Telegram payloads are serialized with fast_json, so the content type is set explicitly.
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def parse_sentiment(sentiment_data: Any) -> Optional[Tuple[int, str]]:
+    """
+    Reads the score and direction from a sentiment response.
+
+    Accepts the JSON object produced by the sentiment tool (as a string or dict) or a bare
+    integer score. A bare score, or an object without a direction, is treated as "neutral".
+
+    Args:
+        sentiment_data (Any): The sentiment response from OpenAI.
+
+    Returns:
+        Optional[Tuple[int, str]]: The score and lowercased direction, or None if the response
+                                   cannot be interpreted.
+    """
+    try:
+        if isinstance(sentiment_data, str):
+            text = sentiment_data.strip()
+            if text.isascii() and text.isdecimal():
+                return int(text), "neutral"
+            match = _SENTIMENT_RE.search(text)
+            if match:
+                # Fast path: take the score and direction straight from the response text.
+                return int(match.group(1)), match.group(2).lower()
+            sentiment_data = fast_json.loads(text)
+        if isinstance(sentiment_data, dict) and "sentiment" in sentiment_data:
+            return int(sentiment_data["sentiment"]), str(sentiment_data.get("direction", "neutral")).lower()
+    except (ValueError, TypeError, fast_json.JSONDecodeError) as e:
+        logging.error(f"Could not process sentiment data: {sentiment_data} | Error: {e}")
+        return None
+    logging.error(f"Unexpected sentiment data: {sentiment_data}")
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class TelegramConfig:
+    """The notification settings from the "system" section of config.json, with defaults applied."""
+    enabled: bool = True
+    chat_id: str = ""
+    heartbeat_chat_id: str = ""
+    sentiment_char_limit: int = 100
+    summary_char_limit: int = 500
+
+    @classmethod
+    def from_system_config(cls, system_config: Dict[str, Any]) -> "TelegramConfig":
+        """
+        Builds a TelegramConfig from the "system" section of config.json.
+
+        Args:
+            system_config (Dict[str, Any]): System configuration settings.
+
+        Returns:
+            TelegramConfig: The resolved settings.
+        """
+        return cls(
+            enabled=system_config.get("telegram_enabled", True),
+            chat_id=system_config.get("telegram_chat_id", ""),
+            heartbeat_chat_id=system_config.get("telegram_heartbeat_recipient", ""),
+            sentiment_char_limit=system_config.get("sentiment_char_limit", 100),
+            summary_char_limit=system_config.get("summary_char_limit", 500)
+        )
+
+
+def _utc_string(timestamp: int) -> str:
+    """Formats a Unix timestamp (in whole seconds) as a UTC string."""
+    return time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(timestamp))
+
+
+@lru_cache(maxsize=1024)
+def _format_utc(timestamp: int) -> str:
+    """Formats a post's Unix timestamp (in whole seconds) as a UTC string, memoizing recent results."""
+    return _utc_string(timestamp)
 
 
 class SocialMediaBot(ABC):
@@ -16,6 +136,43 @@ class SocialMediaBot(ABC):
     and `process_other_sources()` which must be implemented by subclasses.
     """
 
+    def __init__(self) -> None:
+        """
+        Creates the HTTP session shared by all Telegram requests so connections are kept alive,
+        and the thread pool used to run a post's OpenAI calls side by side.
+
+        The Telegram bot token is read from the environment once, here. Messages are posted by a
+        background sender thread, so checks do not wait on Telegram.
+        """
+        self._tg_token: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
+        self._tg_url: str = f"https://api.telegram.org/bot{self._tg_token}/sendMessage"
+        self._tg_session = requests.Session()
+        # Keep enough connections for every thread that may post. Only retry failures where Telegram
+        # cannot have delivered the message: connection errors and rate limiting (429, honouring
+        # Retry-After). Read timeouts and 5xx responses are not retried, as the message may have been sent.
+        self._tg_session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=[429],
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False
+            )
+        ))
+        self._analysis_pool = ThreadPoolExecutor(max_workers=4)
+        # run() starts the report, general and other-source checks side by side on this pool.
+        self._check_pool = ThreadPoolExecutor(max_workers=3)
+        # IDs of posts sent during the current run, so a post found by more than one check is sent once.
+        self._sent_ids: set = set()
+        self._sent_lock = threading.Lock()
+        # The last system config seen and its resolved TelegramConfig.
+        self._tg_config: Optional[Tuple[Dict[str, Any], TelegramConfig]] = None
+        self._outbox: queue.Queue = queue.Queue(maxsize=512)
+        threading.Thread(target=self._telegram_worker, name="telegram-sender", daemon=True).start()
+
     def _format_post_time(self, submission: Any) -> str:
         """
         Converts a submission's timestamp to a human-readable UTC string.
@@ -26,7 +183,56 @@ class SocialMediaBot(ABC):
         Returns:
             str: The formatted UTC time.
         """
-        return time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(submission.created_utc))
+        return _format_utc(int(submission.created_utc))
+
+    def _telegram_config(self, system_config: Dict[str, Any]) -> TelegramConfig:
+        """
+        Returns the resolved TelegramConfig for a system config, building it only when the config changes.
+
+        main.py hands out the same dict until config.json is modified, so the settings are
+        resolved once per config load rather than on every message.
+
+        Args:
+            system_config (Dict[str, Any]): System configuration settings.
+
+        Returns:
+            TelegramConfig: The resolved settings.
+        """
+        cached = self._tg_config
+        if cached is not None and cached[0] is system_config:
+            return cached[1]
+        resolved = TelegramConfig.from_system_config(system_config)
+        self._tg_config = (system_config, resolved)
+        return resolved
+
+    @staticmethod
+    def _min_analyze_chars(system_config: Dict[str, Any]) -> int:
+        """
+        Returns the minimum post length worth sending to OpenAI from the "system" section of config.json.
+
+        Args:
+            system_config (Dict[str, Any]): System configuration settings.
+
+        Returns:
+            int: The "min_analyze_chars" setting, or DEFAULT_MIN_ANALYZE_CHARS if unset.
+        """
+        return system_config.get("min_analyze_chars", DEFAULT_MIN_ANALYZE_CHARS)
+
+    @staticmethod
+    def _has_analyzable_text(text: Optional[str], min_chars: int) -> bool:
+        """
+        Checks whether a post's text is long enough to be worth sending to OpenAI.
+
+        Link and image posts have an empty selftext, so analyzing them only costs an API call.
+
+        Args:
+            text (Optional[str]): The post text.
+            min_chars (int): The minimum stripped length, usually from _min_analyze_chars.
+
+        Returns:
+            bool: True if the stripped text has at least min_chars characters.
+        """
+        return bool(text) and len(text.strip()) >= min_chars
 
     def process_significant_message(
             self,
@@ -39,24 +245,37 @@ class SocialMediaBot(ABC):
     ) -> None:
         """
         Processes a significant post and sends a neatly formatted message to Telegram.
+
+        The sentiment analysis and summary requests are independent, so the summary is requested
+        on a worker thread while the sentiment is requested on the calling thread. Posts with too
+        little text skip both requests and are sent with a neutral sentiment and no summary.
+        Nothing is requested when Telegram notifications are disabled.
         """
-        post_time = self._format_post_time(submission)
-        message_parts = [f"<b>Source:</b> {label}", f"<b>User:</b> {user}"]
-        if social_score:
-            message_parts.append(f"<b>Social Score:</b> {social_score}")
-        message_parts.append(f"<b>Time:</b> {post_time}")
-        link_html = f"<a href='{submission.shortlink}'>View Original Post</a>"
-        message_parts.append(f"\n{link_html}")
-        original_message = "\n".join(message_parts)
-        logging.info(f"Formatted message created:\n{original_message}")
-        sentiment = openai_bot.analyze_sentiment(
-            submission.selftext, system_config.get("sentiment_char_limit", 100)
+        tg_config = self._telegram_config(system_config)
+        if not tg_config.enabled:
+            logging.info("Telegram notifications are disabled; skipping analysis of %s.", submission.id)
+            return
+        with self._sent_lock:
+            if submission.id in self._sent_ids:
+                logging.debug("Post %s was already sent by another check. Skipping.", submission.id)
+                return
+            self._sent_ids.add(submission.id)
+        template = _TPL_WITH_SCORE if social_score else _TPL_NO_SCORE
+        original_message = template.format(
+            label=label, user=user, score=social_score,
+            time=self._format_post_time(submission), link=submission.shortlink
         )
-        summary_limit = system_config.get("summary_char_limit", 500)
-        summary = openai_bot.summarize_text(submission.selftext, summary_limit)
-
-        print("SYSTEM CONFIG IN PROCESS...")
-        print(system_config)
+        logging.info("Formatted message created:\n%s", original_message)
+        if self._has_analyzable_text(submission.selftext, self._min_analyze_chars(system_config)):
+            summary_future = self._analysis_pool.submit(
+                openai_bot.summarize_text, submission.selftext, tg_config.summary_char_limit
+            )
+            sentiment = openai_bot.analyze_sentiment(submission.selftext, tg_config.sentiment_char_limit)
+            summary = summary_future.result()
+        else:
+            sentiment, summary = DEFAULT_EMPTY_SENTIMENT, ""
+
+        logging.debug("System config in process: %s", system_config)
 
         self.send_telegram_message(original_message, sentiment, summary, system_config)
 
@@ -67,30 +286,34 @@ class SocialMediaBot(ABC):
         Args:
             system_config (dict): Configuration settings.
         """
-        if not system_config.get("telegram_enabled", True):
+        tg_config = self._telegram_config(system_config)
+        if not tg_config.enabled:
             return
-        TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-        TELEGRAM_CHAT_ID = system_config.get("telegram_heartbeat_recipient", "")
+        TELEGRAM_CHAT_ID = tg_config.heartbeat_chat_id
         if not TELEGRAM_CHAT_ID:
             logging.warning("No heartbeat recipient specified in config.")
             return
-        send_message_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        timestamp = time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
+        timestamp = _utc_string(int(time.time()))  # Wall-clock time never repeats, so it is not cached.
         heartbeat_message = f"✅ Bot is still running. Last check-in: {timestamp}"
         payload = {"chat_id": TELEGRAM_CHAT_ID, "text": heartbeat_message}
         try:
-            response = requests.post(send_message_url, json=payload)
-            if response.status_code != 200:
-                logging.error(f"Telegram API error: {response.status_code} - {response.text}")
-            else:
-                logging.info("✅ Heartbeat message sent successfully.")
+            response = self._tg_session.post(self._tg_url, data=fast_json.dumpb(payload), headers=_JSON_HEADERS, timeout=10)
+            response.raise_for_status()  # 429 is raised once the session's retries are used up; other errors at once
+            logging.info("✅ Heartbeat message sent successfully.")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error sending heartbeat message: {e}")
+            if e.response is not None:
+                logging.error(f"Telegram API error details: {e.response.text}")
         except Exception as e:
             logging.error(f"Error sending heartbeat message: {e}")
 
 
     def send_telegram_message(self, original_message, sentiment_data, summary, system_config):
         """
-        Sends a single, consolidated message to a Telegram chat.
+        Queues a single, consolidated message for sending to a Telegram chat.
+
+        The message is posted by the background sender thread. If the outbox is full, the message
+        is dropped and an error is logged.
 
         The message is structured as follows:
         - A line of emojis (🔥 for bullish, ❄️ for bearish) representing the sentiment.
@@ -104,50 +327,33 @@ class SocialMediaBot(ABC):
             summary (str): The summary text.
             system_config (dict): Configuration settings.
         """
-        if not system_config.get("telegram_enabled", True):
+        tg_config = self._telegram_config(system_config)
+        if not tg_config.enabled:
             logging.info("Telegram notifications are disabled.")
             return
 
-        TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-        TELEGRAM_CHAT_ID = system_config.get("telegram_chat_id", "")
+        TELEGRAM_BOT_TOKEN = self._tg_token
+        TELEGRAM_CHAT_ID = tg_config.chat_id
 
         if not all([TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID]):
             logging.error("Telegram bot token or chat ID is not configured. Message not sent.")
-            print("==================================================")
-            print(f'TELEGRAM_BOT_TOKEN: {TELEGRAM_BOT_TOKEN}')
-            print(f'TELEGRAM_CHAT_ID: {TELEGRAM_CHAT_ID}')
-            print(f'config: \n\n{system_config}')
-            print("==================================================")
-
-
+            logging.debug("Bot token set: %s, chat ID: %r, config: %s",
+                          bool(TELEGRAM_BOT_TOKEN), TELEGRAM_CHAT_ID, system_config)
             return
 
-        send_message_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-
         # --- Process sentiment into the emoji-only header ---
-        sentiment_header = "❓"  # Default in case of error
-        try:
-            if isinstance(sentiment_data, str):
-                sentiment_data = json.loads(sentiment_data)
-
-            if isinstance(sentiment_data, dict) and "sentiment" in sentiment_data and "direction" in sentiment_data:
-                sentiment_score = int(sentiment_data["sentiment"])
-                direction = sentiment_data["direction"].lower()
-                emoji_count = max(1, sentiment_score // 10)  # Ensure at least one emoji
-
-                if direction == "bullish":
-                    sentiment_header = "🔥" * emoji_count
-                elif direction == "bearish":
-                    sentiment_header = "❄️" * emoji_count
-            else:
-                # Silently use default if format is invalid, as logging will capture it
-                pass
-
-        except (ValueError, KeyError, TypeError, json.JSONDecodeError) as e:
-            logging.error(f"Could not process sentiment data: {sentiment_data} | Error: {e}")
+        sentiment_header = "❓"  # Default for neutral or unreadable sentiment
+        parsed = parse_sentiment(sentiment_data)
+        if parsed is not None:
+            sentiment_score, direction = parsed
+            emoji_count = min(10, max(1, sentiment_score // 10))  # Ensure at least one emoji
+            headers = _SENTIMENT_HEADERS.get(direction)
+            if headers is not None:
+                sentiment_header = headers[emoji_count]
 
         # --- Combine all parts into a single message ---
-        full_message_text = f"{sentiment_header}\n\n{original_message}\n\n{summary}"
+        # The summary is model output, so escape it before sending with parse_mode=HTML.
+        full_message_text = f"{sentiment_header}\n\n{original_message}\n\n{html.escape(summary, quote=False)}"
 
         # --- Prepare and send the API request ---
         payload = {
@@ -157,13 +363,95 @@ class SocialMediaBot(ABC):
         }
 
         try:
-            response = requests.post(send_message_url, json=payload)
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            logging.error("Telegram outbox is full. Message dropped.")
+
+    def _next_batch(
+            self, carried: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Takes the next message from the outbox along with messages queued shortly after it.
+
+        Messages for the same chat are collected while their joined text stays within
+        _BATCH_MAX_CHARS. A message that does not fit is returned separately, to start the next batch.
+
+        Args:
+            carried (Optional[Dict[str, Any]]): A message left over from the previous batch, if any.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]: The payloads to send together, and
+            the message left over for the next batch.
+        """
+        first = carried if carried is not None else self._outbox.get()
+        batch = [first]
+        length = len(first["text"])
+        deadline = time.monotonic() + _BATCH_WINDOW_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                payload = self._outbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if (payload["chat_id"] != first["chat_id"]
+                    or length + len(_BATCH_SEPARATOR) + len(payload["text"]) > _BATCH_MAX_CHARS):
+                return batch, payload
+            batch.append(payload)
+            length += len(_BATCH_SEPARATOR) + len(payload["text"])
+        return batch, None
+
+    def _post_telegram(self, payload: Dict[str, Any]) -> Optional[int]:
+        """
+        Posts one sendMessage payload to Telegram and logs the outcome.
+
+        Args:
+            payload (Dict[str, Any]): The sendMessage payload.
+
+        Returns:
+            Optional[int]: The HTTP status code of the response, or None if no response was received.
+        """
+        try:
+            response = self._tg_session.post(self._tg_url, data=fast_json.dumpb(payload), headers=_JSON_HEADERS, timeout=10)
             response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
             logging.info("Telegram message sent successfully.")
+            return response.status_code
         except requests.exceptions.RequestException as e:
             logging.error(f"Error sending Telegram message: {e}")
-            if e.response:
+            if e.response is not None:
                 logging.error(f"Telegram API error details: {e.response.text}")
+                return e.response.status_code
+        except Exception as e:
+            logging.error(f"Unexpected error sending Telegram message: {e}")
+        return None
+
+    def _telegram_worker(self) -> None:
+        """
+        Posts queued Telegram messages for the lifetime of the process.
+
+        Messages queued within a short window of each other are sent as one combined message,
+        which keeps bursts of posts under Telegram's flood limits. If Telegram rejects a combined
+        message (a 4xx other than rate limiting), its messages are resent one by one so a single
+        bad message does not take the rest of the batch down with it.
+        """
+        carried: Optional[Dict[str, Any]] = None
+        while True:
+            batch, carried = self._next_batch(carried)
+            try:
+                combined = {**batch[0], "text": _BATCH_SEPARATOR.join(payload["text"] for payload in batch)}
+                status = self._post_telegram(combined)
+                if len(batch) > 1 and status is not None and 400 <= status < 500 and status != 429:
+                    logging.warning(f"Combined Telegram message rejected; resending its {len(batch)} messages separately.")
+                    for payload in batch:
+                        self._post_telegram(payload)
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    def wait_for_outbox(self) -> None:
+        """Blocks until every queued Telegram message has been sent (or has failed)."""
+        self._outbox.join()
 
     @abstractmethod
     def check_reports(self, reports_list: List[str], openai_bot: Any, cache_manager: Any, config: Dict[str, Any]) -> None:
@@ -177,25 +465,35 @@ class SocialMediaBot(ABC):
 
     @abstractmethod
     def process_other_sources(self, sources: Dict[str, Any], openai_bot: Any, cache_manager: Any, config: Dict[str, Any]) -> None:
-        # CHANGE THIS: from system_config to config
         """
         Processes additional sources not covered by reports or general categories.
         """
         raise NotImplementedError("Subclasses must implement process_other_sources()")
 
     def run(self, sources: Dict[str, Any], openai_bot: Any, cache_manager: Any, config: Dict[str, Any]) -> None:
-        """Runs checks for reports, general posts, and additional sources."""
-        # This no longer needs to be extracted here
-        # system_config = config.get("system", {})
+        """
+        Runs checks for reports, general posts, and additional sources.
 
+        The three checks run concurrently. A post that more than one of them picks up (e.g. a
+        report user's post in a watched subreddit) is only sent once per run.
+        """
         logging.info("Running checks for some platform")
         reports_list = sources.get("reports", [])
         general_list = sources.get("general", [])
-        other_sources = {k: v for k, v in sources.items() if k not in ["reports", "general"]}
+        other_sources = {k: sources[k] for k in sources.keys() - _USER_LIST_KEYS}
+
+        with self._sent_lock:
+            self._sent_ids = set()
 
         # Pass the FULL config object to all methods for consistency
-        self.check_reports(reports_list, openai_bot, cache_manager, config)
-        self.check_general(general_list, openai_bot, cache_manager, config)
-        self.process_other_sources(other_sources, openai_bot, cache_manager, config)
+        futures = {
+            self._check_pool.submit(self.check_reports, reports_list, openai_bot, cache_manager, config): "reports",
+            self._check_pool.submit(self.check_general, general_list, openai_bot, cache_manager, config): "general",
+            self._check_pool.submit(self.process_other_sources, other_sources, openai_bot, cache_manager, config): "other sources",
+        }
+        wait(futures)
+        for future, name in futures.items():
+            if future.exception() is not None:
+                logging.error(f"Error checking {name}: {future.exception()}")
 
         logging.info("Checks finished for that platform")
\ No newline at end of file